@@ -1,18 +1,26 @@
 """
 Minimal MCP Server that provides tools for analyzing file changes and suggesting PR Templates
 """
-import json
+import asyncio
+import heapq
 import logging
 import os
 import re
 import subprocess
+import time
+import weakref
+from collections import Counter, OrderedDict, namedtuple
+from operator import itemgetter
 from pathlib import Path
 from typing import Optional
 
 from mcp.server.fastmcp import FastMCP
 
-logging.basicConfig(level=logging.DEBUG)
+# Handlers are left to the host (FastMCP installs a stderr handler on startup). GITHUB_MCP_DEBUG only
+# lowers this module's level: a root-level DEBUG would format every debug record in mcp/asyncio too
 logger = logging.getLogger(__name__)
+if os.getenv("GITHUB_MCP_DEBUG"):
+    logger.setLevel(logging.DEBUG)
 
 # Initialize FastMCP Server
 mcp = FastMCP("github-mcp-server")
@@ -20,9 +28,10 @@ mcp = FastMCP("github-mcp-server")
 # PR Templates directory (shared across all modules)
 # TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
 
-TEMPLATES_DIR = Path(os.getenv("GITHUB_MCP_TEMPLATES_DIR")) if os.getenv("GITHUB_MCP_TEMPLATES_DIR") else Path(
-    __file__).parent / "templates"
-print(TEMPLATES_DIR)
+_templates_dir_env = os.getenv("GITHUB_MCP_TEMPLATES_DIR")
+TEMPLATES_DIR = Path(_templates_dir_env) if _templates_dir_env else Path(__file__).parent / "templates"
+# Never print here: with the stdio transport stdout carries the JSON-RPC stream
+logger.debug("Using templates dir: %s", TEMPLATES_DIR)
 
 # Default PT Templates
 DEFAULT_TEMPLATES = {
@@ -53,28 +62,343 @@ TYPE_MAPPING = {
 }
 
 TEMPLATE_KEYWORDS = {
-    "bug.md": {"bug", "fix", "error", "issue", "crash", "fault"},
-    "feature.md": {"feature", "enhancement", "add", "new", "implement", "upgrade"},
-    "docs.md": {"docs", "documentation", "readme", "guide", "manual", "instructions"},
-    "refactor.md": {"refactor", "cleanup", "restructure", "optimize", "simplify"},
-    "test.md": {"test", "coverage", "unittest", "integration", "assert"},
-    "performance.md": {"performance", "optimize", "speed", "benchmark", "improve"},
-    "security.md": {"security", "vulnerability", "exploit", "safe", "penetration"},
+    "bug.md": frozenset({"bug", "fix", "error", "issue", "crash", "fault"}),
+    "feature.md": frozenset({"feature", "enhancement", "add", "new", "implement", "upgrade"}),
+    "docs.md": frozenset({"docs", "documentation", "readme", "guide", "manual", "instructions"}),
+    "refactor.md": frozenset({"refactor", "cleanup", "restructure", "optimize", "simplify"}),
+    "test.md": frozenset({"test", "coverage", "unittest", "integration", "assert"}),
+    "performance.md": frozenset({"performance", "optimize", "speed", "benchmark", "improve"}),
+    "security.md": frozenset({"security", "vulnerability", "exploit", "safe", "penetration"}),
 }
 
+# Inverted index keyword -> templates listing it, so only templates sharing a token with the summary get scored
+_KEYWORD_INDEX = {
+    keyword: frozenset(filename for filename, keywords in TEMPLATE_KEYWORDS.items() if keyword in keywords)
+    for keyword in frozenset().union(*TEMPLATE_KEYWORDS.values())
+}
+
+# Friendly template type names as (filename substring, name) rules; the first matching rule wins
+TEMPLATE_TYPE_RULES = (
+    ("bug", "Bug Fix"),
+    ("feature", "Feature"),
+    ("docs", "Documentation"),
+    ("refactor", "Refactor"),
+    ("test", "Test"),
+    ("performance", "Performance"),
+    ("security", "Security")
+)
+_TEMPLATE_TYPE_NAMES = tuple(name for _, name in TEMPLATE_TYPE_RULES)
+
+# One anchored group per rule, tried in rule order, so match.lastindex is the first rule whose
+# substring occurs anywhere in the name (a plain search would return the leftmost substring instead)
+_TEMPLATE_TYPE_RE = re.compile(
+    "|".join(f".*?({re.escape(key)})" for key, _ in TEMPLATE_TYPE_RULES), re.DOTALL
+)
+
+# Compiled once at import so tokenize() doesn't go through the re cache on every call.
+# \w+ is greedy, so the \b anchors of the original \b\w+\b never changed a match.
+_TOKEN_RE = re.compile(r'\w+')
+
+# Maps every ASCII non-word character to a space, so ASCII text tokenizes with translate() + split()
+_TOKEN_TABLE = str.maketrans({c: " " for c in map(chr, range(128)) if not (c.isalnum() or c == "_")})
+
+# Commit subject categories, highest priority first, with the substrings that select them
+COMMIT_CATEGORY_RULES = (
+    ("feature", ("add", "feature")),
+    ("bugfix", ("fix",)),
+    ("docs", ("doc",)),
+    ("refactor", ("refactor",)),
+)
+_COMMIT_CATEGORIES = tuple(category for category, _ in COMMIT_CATEGORY_RULES)
+
+# One group per rule, tried in rule order from the start of the subject: the first rule with a
+# substring anywhere in it wins (not the leftmost substring), and match.lastindex names the rule.
+# ASCII-only case folding matches str.lower() on these substrings; Unicode folding would not
+# ("fİx" lowers to "fi̇x"), and DOTALL keeps "anywhere" true across embedded newlines.
+_COMMIT_CATEGORY_RE = re.compile(
+    "|".join(
+        f".*?({'|'.join(map(re.escape, substrings))})" for _, substrings in COMMIT_CATEGORY_RULES
+    ),
+    re.IGNORECASE | re.ASCII | re.DOTALL
+)
+
+# Substrings that flag a diff line as possibly containing a secret (matched case-insensitively)
+SENSITIVE_KEYWORDS = ("secret", "token", "apikey", "password", "auth")
+
+# Encoded once so the scan runs bytes.find() straight on the raw (lowercased) git output
+_SENSITIVE_KEYWORDS_BYTES = tuple(keyword.encode() for keyword in SENSITIVE_KEYWORDS)
+
 
 def tokenize(text: str):
-    """Simple tokenizer splitting on non-alphanumeric, lowercase tokens."""
-    return re.findall(r'\b\w+\b', text.lower())
+    """
+    Simple tokenizer splitting on non-alphanumeric, lowercase tokens.
+
+    ASCII text takes a str.translate() fast path that yields the same tokens as the regex;
+    anything else goes through the regex so Unicode letters and punctuation are handled.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text.translate(_TOKEN_TABLE).split()
+    return _TOKEN_RE.findall(text)
+
+
+def find_sensitive_lines(diff: bytes) -> list:
+    """
+    Return the lines of diff that contain a SENSITIVE_KEYWORDS entry, in order, each at most once.
+
+    The diff is lowercased once, then each keyword is located with bytes.find() (a C-level
+    substring search) and widened to its line; a line is skipped once it has matched. "\r\n" and
+    "\r" also end a line, as they did when git's output was read in text mode.
+    """
+    diff = diff.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    lowered = diff.lower()
+    line_starts = set()
+    for keyword in _SENSITIVE_KEYWORDS_BYTES:
+        pos = lowered.find(keyword)
+        while pos != -1:
+            line_starts.add(lowered.rfind(b"\n", 0, pos) + 1)
+            line_end = lowered.find(b"\n", pos + len(keyword))
+            if line_end == -1:
+                break
+            pos = lowered.find(keyword, line_end + 1)
+
+    lines = []
+    for start in sorted(line_starts):
+        end = diff.find(b"\n", start)
+        lines.append(diff[start:] if end == -1 else diff[start:end])
+    return lines
+
+
+# Parsed output of the git commands behind analyze_file_changes (files_changed is a tuple of dicts)
+DiffSnapshot = namedtuple(
+    "DiffSnapshot", ["files_changed", "statistics", "commits", "diff", "truncated", "total_diff_lines"]
+)
+
+# Most recently used DiffSnapshots, keyed by (cwd, base_sha, head_sha, max_diff_lines)
+_DIFF_CACHE_SIZE = 32
+_diff_cache = OrderedDict()
+
+# Read size used when streaming `git diff` output
+_DIFF_READ_CHUNK = 64 * 1024
+
+# Caps git processes running at once across concurrent tool calls (one analyze_file_changes runs at most three)
+_GIT_CONCURRENCY = 8
+
+# One semaphore per event loop: asyncio primitives bind to the first loop they wait in, so a
+# module-level one would fail in every later loop (pytest-asyncio's per-test loops, multi-loop hosts)
+_git_semaphores = weakref.WeakKeyDictionary()
+
+# Every git command is read-only: don't take optional locks (e.g. the index refresh on `git diff`),
+# never block on a credential/terminal prompt, and skip auto-gc and fsmonitor startup.
+# Global/system config stays loaded: it carries safe.directory and the user's diff settings.
+# Only the overrides live here; the environment itself is read when each process starts.
+_GIT_ENV_OVERRIDES = {"GIT_OPTIONAL_LOCKS": "0", "GIT_TERMINAL_PROMPT": "0"}
+_GIT_COMMAND = ("git", "-c", "gc.auto=0", "-c", "core.fsmonitor=false")
+
+# `git --version` output, probed once per process (the binary doesn't change under a running server)
+_git_version = None
+
+
+def _decode(output: bytes) -> str:
+    """Decode git output, replacing invalid UTF-8 (e.g. Latin-1 file content) instead of failing."""
+    return output.decode("utf-8", errors="replace")
+
+
+def _git_semaphore() -> asyncio.Semaphore:
+    """Semaphore bounding the git processes started from the running event loop."""
+    loop = asyncio.get_running_loop()
+    semaphore = _git_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _git_semaphores[loop] = asyncio.Semaphore(_GIT_CONCURRENCY)
+    return semaphore
+
+
+async def _run_git(cwd: Optional[str], *args: str) -> bytes:
+    """
+    Run a git command without blocking the event loop and return its raw stdout.
+
+    Output stays bytes so callers only decode what they actually return. cwd=None runs
+    in the server's working directory. At most _GIT_CONCURRENCY git processes run at once per event loop.
+    Raises subprocess.CalledProcessError on a non-zero exit, like subprocess.run(check=True).
+    """
+    async with _git_semaphore():
+        process = await asyncio.create_subprocess_exec(
+            *_GIT_COMMAND, *args,
+            cwd=cwd,
+            env={**os.environ, **_GIT_ENV_OVERRIDES},
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, ["git", *args], output=stdout, stderr=_decode(stderr)
+        )
+    return stdout
+
+
+async def _get_git_version() -> str:
+    """Return `git --version`, running git only on the first call."""
+    global _git_version
+
+    if _git_version is None:
+        _git_version = _decode(await _run_git(None, "--version")).strip()
+    return _git_version
+
+
+async def _stream_diff(cwd: str, diff_base: str, max_lines: int) -> tuple:
+    """
+    Stream `git diff` and keep only its first max_lines lines.
+
+    The remaining output is only counted chunk by chunk, so memory stays proportional
+    to max_lines instead of the size of the diff.
+
+    Returns:
+        (text of the first max_lines lines, total number of lines)
+    """
+    async with _git_semaphore():
+        process = await asyncio.create_subprocess_exec(
+            *_GIT_COMMAND, "diff", diff_base,
+            cwd=cwd,
+            env={**os.environ, **_GIT_ENV_OVERRIDES},
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+
+        head = bytearray()
+        newlines = 0
+
+        async def read_stdout():
+            nonlocal newlines
+            while chunk := await process.stdout.read(_DIFF_READ_CHUNK):
+                if newlines < max_lines:
+                    head.extend(chunk)
+                newlines += chunk.count(b"\n")
+
+        _, stderr = await asyncio.gather(read_stdout(), process.stderr.read())
+        await process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, ["git", "diff", diff_base], stderr=_decode(stderr)
+        )
+
+    # Cut at a line boundary before decoding, so a multi-byte character split by a chunk is never decoded
+    lines = bytes(head).split(b"\n", max_lines)[:max_lines]
+    return _decode(b"\n".join(lines)), newlines + 1
+
+
+def _parse_diff_summary(output: bytes) -> tuple:
+    """
+    Parse `git diff -z --raw --numstat` output into (files_changed, statistics).
+
+    git prints one raw record per file (":<modes> <shas> <status>", then the path) followed by
+    the numstat records, so one diff run yields both. Records are NUL-separated, so paths are
+    taken verbatim (no quoting, tabs allowed). files_changed is [{"status": ..., "file": ...}, ...];
+    renames and copies (R100, C75, ...) carry two paths and also report "old_file".
+    """
+    fields = output.split(b"\0")
+    files_changed = []
+    i = 0
+    while i < len(fields) and fields[i].startswith(b":"):
+        status = fields[i].rsplit(b" ", 1)[1].decode("ascii")
+        if status[0] in "RC":
+            files_changed.append(
+                {"status": status, "file": _decode(fields[i + 2]), "old_file": _decode(fields[i + 1])}
+            )
+            i += 3
+        else:
+            files_changed.append({"status": status, "file": _decode(fields[i + 1])})
+            i += 2
+    return files_changed, _format_numstat(fields[i:])
+
+
+def _format_numstat(fields: list) -> str:
+    """
+    Render NUL-split `git diff -z --numstat` records as a --stat style summary.
+
+    One " path | +added -deleted" row per file (binary files show "Bin"), renames as
+    "old => new", followed by git's "N files changed, X insertions(+), Y deletions(-)" line.
+    """
+    rows = []
+    insertions = deletions = 0
+    fields = iter(fields)
+    for record in fields:
+        if not record:
+            break
+        added, deleted, path = record.split(b"\t", 2)
+        if path:
+            path = _decode(path)
+        else:
+            # Renames and copies leave the path empty and follow with the old and new path
+            old_path = _decode(next(fields))
+            path = f"{old_path} => {_decode(next(fields))}"
+        if added == b"-":
+            rows.append((path, "Bin"))
+        else:
+            insertions += int(added)
+            deletions += int(deleted)
+            rows.append((path, f"+{int(added)} -{int(deleted)}"))
+    if not rows:
+        return ""
+
+    # Same pluralization and zero-count rules as git's own --stat summary line
+    summary = f" {len(rows)} file{'s' if len(rows) != 1 else ''} changed"
+    if insertions or not deletions:
+        summary += f", {insertions} insertion{'s' if insertions != 1 else ''}(+)"
+    if deletions or not insertions:
+        summary += f", {deletions} deletion{'s' if deletions != 1 else ''}(-)"
 
+    width = max(len(path) for path, _ in rows)
+    return "".join(f" {path:<{width}} | {change}\n" for path, change in rows) + summary + "\n"
 
-def compute_token_overlap_score(text_tokens, keywords):
-    """Compute simple overlap score as ratio of keyword tokens found in text."""
-    if not keywords:
-        return 0.0
-    text_token_counts = Counter(text_tokens)
-    matched = sum(min(text_token_counts[k], 1) for k in keywords)
-    return matched / len(keywords)
+
+async def _collect_diff(cwd: str, base_sha: str, head_sha: str, max_diff_lines: Optional[int]) -> DiffSnapshot:
+    """
+    Run the git diff/log commands for base_sha...head_sha concurrently and parse their output.
+
+    Only the first max_diff_lines lines of the diff are kept, already rendered with the
+    truncation notice; pass None to skip the diff. Memoized on the resolved commit shas
+    and max_diff_lines: the three-dot range only depends on commits (not the working
+    tree), so repeated calls for an unchanged branch skip every git subprocess.
+    """
+    key = (cwd, base_sha, head_sha, max_diff_lines)
+    if key in _diff_cache:
+        _diff_cache.move_to_end(key)
+        return _diff_cache[key]
+
+    diff_base = f"{base_sha}...{head_sha}"
+    git_commands = [
+        _run_git(cwd, "diff", "-z", "--raw", "--numstat", diff_base),
+        _run_git(cwd, "log", "--oneline", diff_base)
+    ]
+    # The full patch is the expensive one (blob reads + text generation); skip it unless asked for
+    if max_diff_lines is not None:
+        git_commands.append(_stream_diff(cwd, diff_base, max_diff_lines))
+    summary_out, commits_out, *diff_out = await asyncio.gather(*git_commands)
+
+    files_changed, statistics = _parse_diff_summary(summary_out)
+    diff_content, truncated, total_diff_lines = None, False, 0
+    if diff_out:
+        diff_content, total_diff_lines = diff_out[0]
+        truncated = total_diff_lines > max_diff_lines
+        if truncated:
+            diff_content += f"\n\n... Output truncated. Showing {max_diff_lines} of {total_diff_lines} lines ..."
+            diff_content += "\n... Use max_diff_lines parameter to see more ..."
+
+    snapshot = DiffSnapshot(
+        tuple(files_changed), statistics, _decode(commits_out), diff_content, truncated, total_diff_lines
+    )
+    _diff_cache[key] = snapshot
+    if len(_diff_cache) > _DIFF_CACHE_SIZE:
+        _diff_cache.popitem(last=False)
+    return snapshot
+
+
+def _with_debug(payload: dict, debug_info: Optional[dict]) -> dict:
+    """Attach the _debug block to a tool response when debugging was requested."""
+    if debug_info is not None:
+        payload["_debug"] = debug_info
+    return payload
 
 
 """
@@ -90,137 +414,254 @@ async def analyze_file_changes(
         base_branch: str = "master",
         include_diff: bool = True,
         max_diff_lines: int = 500,
-        working_directory: Optional[str] = None
-):
+        working_directory: Optional[str] = None,
+        debug: bool = False,
+        if_head_sha: Optional[str] = None,
+        if_base_sha: Optional[str] = None
+) -> dict:
+    """
+    Analyze the files, statistics, commits and (optionally truncated) diff between base_branch and HEAD.
+
+    Args:
+        base_branch: Branch to compare HEAD against (default: master)
+        include_diff: Include the diff text itself
+        max_diff_lines: Maximum number of diff lines to return
+        working_directory: Repository to inspect; defaults to the first MCP root, then the server cwd
+        debug: Attach a "_debug" block describing how the working directory was resolved
+        if_head_sha: head_sha from a previous response
+        if_base_sha: base_sha from the same response; if HEAD and base_branch still resolve to
+            both shas, only {"unchanged": true, "head_sha": ..., "base_sha": ...} is returned
+    """
+    debug_info = None
     try:
         # Determine working directory
+        roots_result = None
+        roots_error = None
         if working_directory is None:
             try:
                 context = mcp.get_context()
                 roots_result = await context.session.list_roots()
                 root = roots_result.roots[0]
                 working_directory = root.uri.path
-            except Exception:
-                pass  # fallback to os.getcwd()
+            except Exception as e:
+                roots_error = e  # fallback to os.getcwd()
 
         cwd = working_directory if working_directory else os.getcwd()
         cwd_path = Path(cwd)
 
-        debug_info = {
-            "provided_working_directory": working_directory,
-            "actual_cwd": cwd,
-            "server_process_cwd": os.getcwd(),
-            "server_file_location": str(Path(__file__).parent),
-            "roots_check": None,
-            "git_repo_detected": False,
-            "git_version": None
-        }
-
-        # Check if current directory is a git repo
-        try:
-            git_check = subprocess.run(
-                ["git", "rev-parse", "--is-inside-work-tree"],
-                capture_output=True, text=True, cwd=cwd, check=True
-            )
-            is_git_repo = git_check.stdout.strip() == "true"
-            debug_info["git_repo_detected"] = is_git_repo
-        except subprocess.CalledProcessError:
-            is_git_repo = False
+        if debug:
+            debug_info = {
+                "provided_working_directory": working_directory,
+                "actual_cwd": cwd,
+                "server_process_cwd": os.getcwd(),
+                "server_file_location": str(Path(__file__).parent),
+                "roots_check": None,
+                "git_repo_detected": False,
+                "git_version": None
+            }
 
-        # Get git version for reference/debug
-        try:
-            git_version = subprocess.run(
-                ["git", "--version"], capture_output=True, text=True, check=True
-            )
-            debug_info["git_version"] = git_version.stdout.strip()
-        except Exception:
-            pass
+        # Resolve both ends of the range to commit shas; the shas key the cached git output, so new
+        # commits on either branch invalidate it automatically. `--verify --end-of-options <rev>^{commit}`
+        # yields exactly one commit or fails, so base_branch can never be read as an option
+        # ("--output=...") or expand to a range ("a..b", "a^@"). The HEAD probe also checks for a
+        # work tree. In debug mode the (cached) git version probe runs alongside them.
+        git_commands = [
+            _run_git(cwd, "rev-parse", "--is-inside-work-tree", "--verify", "--end-of-options", "HEAD^{commit}"),
+            _run_git(cwd, "rev-parse", "--verify", "--end-of-options", f"{base_branch}^{{commit}}")
+        ]
+        if debug:
+            git_commands.append(_get_git_version())
+        head_result, base_result, *version_result = await asyncio.gather(*git_commands, return_exceptions=True)
+
+        # rev-parse prints "true" before failing on a bad revision, so a failed call
+        # still tells a missing repository apart from an unborn HEAD
+        if isinstance(head_result, subprocess.CalledProcessError):
+            head_out = head_result.output
+        elif isinstance(head_result, Exception):
+            raise head_result
+        else:
+            head_out = head_result
+        is_git_repo = head_out.startswith(b"true\n")
 
-        # roots debug again (redundant, but safe)
-        try:
-            context = mcp.get_context()
-            roots_result = await context.session.list_roots()
-            debug_info["roots_check"] = {
-                "found": True,
-                "count": len(roots_result.roots),
-                "roots": [str(root.uri) for root in roots_result.roots]
-            }
-        except Exception as e:
-            debug_info["roots_check"] = {
-                "found": False,
-                "error": str(e)
-            }
+        if debug:
+            debug_info["git_repo_detected"] = is_git_repo
 
-        # Prepare git diff commands depending on repo detection
-        if is_git_repo:
-            # Normal git diff commands inside repo
-            diff_base = f"{base_branch}...HEAD"
+            # Get git version for reference/debug
+            if not isinstance(version_result[0], Exception):
+                debug_info["git_version"] = version_result[0]
+
+            # Reuse the roots fetched above; only ask the client when they weren't needed yet
+            if roots_result is None and roots_error is None:
+                try:
+                    context = mcp.get_context()
+                    roots_result = await context.session.list_roots()
+                except Exception as e:
+                    roots_error = e
+            if roots_result is not None:
+                debug_info["roots_check"] = {
+                    "found": True,
+                    "count": len(roots_result.roots),
+                    "roots": [str(root.uri) for root in roots_result.roots]
+                }
+            else:
+                debug_info["roots_check"] = {
+                    "found": False,
+                    "error": str(roots_error)
+                }
 
-            files_cmd = ["git", "diff", "--name-status", diff_base]
-            stat_cmd = ["git", "diff", "--stat", diff_base]
-            diff_cmd = ["git", "diff", diff_base]
-            commits_cmd = ["git", "log", "--oneline", diff_base]
-        else:
+        if not is_git_repo:
             # Not a git repo: fallback to --no-index diff for files changed (empty, or directories)
             # Here, we can only do limited diffs, for example between base_branch folder and current
             # But since base_branch is not valid, just return an error message with debug info
-            return {
-                "result": json.dumps({
-                    "error": (
-                        "Current directory is NOT a git repository. "
-                        "Please provide a valid git repo working_directory or run inside a repo."
-                    ),
-                    "_debug": debug_info
-                })
-            }
-
-        # Run commands and collect results
-        files_result = subprocess.run(files_cmd, capture_output=True, text=True, check=True, cwd=cwd)
-        files_changed = []
-        for line in files_result.stdout.strip().split('\n'):
-            if line:
-                parts = line.strip().split('\t')
-                if len(parts) == 2:
-                    status, filename = parts
-                    files_changed.append({"status": status, "file": filename})
-
-        stat_result = subprocess.run(stat_cmd, capture_output=True, text=True, cwd=cwd)
-
-        diff_content = ""
-        truncated = False
-        diff_lines = []
-
-        if include_diff:
-            diff_result = subprocess.run(diff_cmd, capture_output=True, text=True, cwd=cwd)
-            diff_lines = diff_result.stdout.split('\n')
-
-            if len(diff_lines) > max_diff_lines:
-                diff_content = '\n'.join(diff_lines[:max_diff_lines])
-                diff_content += f"\n\n... Output truncated. Showing {max_diff_lines} of {len(diff_lines)} lines ..."
-                diff_content += "\n... Use max_diff_lines parameter to see more ..."
-                truncated = True
-            else:
-                diff_content = diff_result.stdout
+            return _with_debug({
+                "error": (
+                    "Current directory is NOT a git repository. "
+                    "Please provide a valid git repo working_directory or run inside a repo."
+                )
+            }, debug_info)
+
+        if isinstance(head_result, Exception):
+            raise head_result
+        if isinstance(base_result, subprocess.CalledProcessError):
+            raise subprocess.CalledProcessError(
+                base_result.returncode, base_result.cmd,
+                stderr=f"base_branch {base_branch!r} does not name a single commit ({base_result.stderr.strip()})"
+            )
+        if isinstance(base_result, Exception):
+            raise base_result
+        head_sha = _decode(head_out).split()[1]
+        base_sha = _decode(base_result).strip()
+        # Both ends must match: a moved, reset or different base_branch changes the result as well
+        if (head_sha, base_sha) == (if_head_sha, if_base_sha):
+            return _with_debug({"unchanged": True, "head_sha": head_sha, "base_sha": base_sha}, debug_info)
 
-        commits_result = subprocess.run(commits_cmd, capture_output=True, text=True, cwd=cwd)
+        snapshot = await _collect_diff(cwd, base_sha, head_sha, max_diff_lines if include_diff else None)
 
         analysis = {
             "base_branch": base_branch,
-            "files_changed": files_changed,
-            "statistics": stat_result.stdout,
-            "commits": commits_result.stdout,
-            "diff": diff_content if include_diff else "Diff not included (set include_diff=true to see full diff)",
-            "truncated": truncated,
-            "total_diff_lines": len(diff_lines) if include_diff else 0,
-            "_debug": debug_info
+            "head_sha": head_sha,
+            "base_sha": base_sha,
+            # Fresh dicts per response: the snapshot is shared through the cache, callers may mutate this
+            "files_changed": [dict(entry) for entry in snapshot.files_changed],
+            "statistics": snapshot.statistics,
+            "commits": snapshot.commits
         }
 
-        return {"result": json.dumps(analysis)}
+        # Diff fields are only reported when the diff was requested (and git was asked for it)
+        if include_diff:
+            analysis["diff"] = snapshot.diff
+            analysis["truncated"] = snapshot.truncated
+            analysis["total_diff_lines"] = snapshot.total_diff_lines
+
+        return _with_debug(analysis, debug_info)
 
     except subprocess.CalledProcessError as e:
-        return {"result": json.dumps({"error": f"Git Error: {e.stderr}", "_debug": debug_info})}
+        return _with_debug({"error": f"Git Error: {e.stderr}"}, debug_info)
     except Exception as e:
-        return {"result": json.dumps({"error": str(e), "_debug": debug_info})}
+        return _with_debug({"error": str(e)}, debug_info)
+
+
+def _derive_type(filename: str) -> str:
+    """Friendly template type for a filename, e.g. "bug.md" -> "Bug Fix"."""
+    # Remove extension, replace underscores with spaces, capitalize words
+    base = filename.lower().replace(".md", "").replace("_", " ")
+    # Map to friendly names or fallback to Title Case filename without extension
+    match = _TEMPLATE_TYPE_RE.match(base)
+    return _TEMPLATE_TYPE_NAMES[match.lastindex - 1] if match else base.title()
+
+
+# (signature, tuple of templates) from the last get_pr_template scan
+_templates_cache = None
+
+# ((templates dir, its mtime_ns), sorted *.md paths); adding, removing or renaming a file bumps the dir mtime
+_templates_listing = None
+
+# Filesystem timestamps are coarse (a kernel tick, 2 s on FAT), so a file or directory changed this
+# recently can change again without a new mtime. Caches keyed on such an mtime are not reused
+_RACY_MTIME_WINDOW_NS = 2_000_000_000
+
+
+def _is_racy(mtime_ns: int) -> bool:
+    """Whether mtime_ns is too recent to prove that nothing changed since it was read."""
+    return time.time_ns() - mtime_ns < _RACY_MTIME_WINDOW_NS
+
+
+def _list_templates() -> list:
+    """Sorted *.md file paths in TEMPLATES_DIR, re-listed only when the directory or its mtime changes."""
+    global _templates_listing
+
+    try:
+        key = (TEMPLATES_DIR, TEMPLATES_DIR.stat().st_mtime_ns)
+        if _templates_listing is None or _templates_listing[0] != key:
+            # scandir + name check instead of Path.glob: no pattern matching, and is_file() comes from the dirent
+            with os.scandir(TEMPLATES_DIR) as entries:
+                names = sorted(
+                    (entry.name for entry in entries if entry.name.endswith(".md") and entry.is_file()),
+                    key=str.lower
+                )
+            _templates_listing = (None if _is_racy(key[1]) else key, [TEMPLATES_DIR / name for name in names])
+    except OSError:
+        return []
+    return _templates_listing[1]
+
+
+def _templates_signature(paths) -> tuple:
+    """
+    Fingerprint template files by path, mtime and size, or None if any mtime is racy.
+
+    The directory mtime alone is not enough: editing a file in place doesn't change it.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            signature.append((str(path), None, None))
+            continue
+        if _is_racy(stat.st_mtime_ns):
+            return None
+        signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+async def _load_templates() -> list:
+    """
+    Templates as [{"filename", "type", "content"}, ...], sorted by filename.
+
+    Shared by get_pr_template and suggest_templates; the list is only rebuilt (and the files
+    only re-read) when _templates_signature changes. Each call gets its own dicts, so callers
+    can't alter the cached copy.
+    """
+    global _templates_cache
+
+    md_files = _list_templates()
+
+    # Reuse the previous result while no template was added, removed or edited
+    signature = _templates_signature(md_files)
+    if signature is not None and _templates_cache is not None and _templates_cache[0] == signature:
+        return [dict(template) for template in _templates_cache[1]]
+
+    templates = []
+
+    # Read all templates concurrently in worker threads instead of blocking the event loop per file
+    contents = await asyncio.gather(
+        *(asyncio.to_thread(path.read_text, encoding="utf-8") for path in md_files),
+        return_exceptions=True
+    )
+
+    for path, content in zip(md_files, contents):
+        filename = path.name
+        if isinstance(content, Exception):
+            content = f"Error loading template '{filename}': {str(content)}"
+        template_type = _derive_type(filename)
+        templates.append({
+            "filename": filename,
+            "type": template_type,
+            "content": content
+        })
+
+    _templates_cache = (signature, tuple(dict(template) for template in templates))
+    return templates
 
 
 """
@@ -238,45 +679,25 @@ async def get_pr_template() -> dict:
     sort them alphabetically, and optionally allow Claude to add new templates dynamically.
 
     Returns:
-        JSON list of templates with filename, type (derived), and file content.
+        {"result": [...]} (like the other tools, and so FastMCP sends one content block rather
+        than one per template) with each template's filename, type (derived), and file content.
         If a template file is missing or unreadable, an error message is included as content.
     """
-    templates = []
+    return {"result": await _load_templates()}
 
-    md_files = sorted(TEMPLATES_DIR.glob("*.md"), key=lambda p: p.name.lower())
-
-    def derive_type(filename: str) -> str:
-        # Remove extension, replace underscores with spaces, capitalize words
-        base = filename.lower().replace(".md", "").replace("_", " ")
-        # Map to friendly names or fallback
-        type_map = {
-            "bug": "Bug Fix",
-            "feature": "Feature",
-            "docs": "Documentation",
-            "refactor": "Refactor",
-            "test": "Test",
-            "performance": "Performance",
-            "security": "Security"
-        }
-        for key, friendly in type_map.items():
-            if key in base:
-                return friendly
-        # Fallback: Title Case filename without extension
-        return base.title()
 
-    for path in md_files:
-        filename = path.name
-        try:
-            content = path.read_text(encoding="utf-8")
-        except Exception as e:
-            content = f"Error loading template '{filename}': {str(e)}"
-        template_type = derive_type(filename)
-        templates.append({
-            "filename": filename,
-            "type": template_type,
-            "content": content
-        })
-    return {"result": json.dumps(templates)}
+def _template_suggestion(template: dict, alternatives: list, score: float, reasoning: str) -> dict:
+    """Build the suggest_templates response for the selected template."""
+    confidence_level = "high" if score > 0.6 else "medium" if score > 0.3 else "low"
+    return {
+        "recommended_template": template,
+        "alternatives": alternatives,
+        "confidence_level": confidence_level,
+        "confidence_score": score,
+        "reasoning": reasoning,
+        "template_content": template["content"],
+        "usage_hint": "Claude can assist filling this template or consider alternatives if needed."
+    }
 
 
 """
@@ -288,24 +709,38 @@ Improvements v1.0 -
 
 
 @mcp.tool()
-async def suggest_templates(changes_summary: str, change_type: str = None) -> str:
+async def suggest_templates(changes_summary: str, change_type: str = None) -> dict:
     """
     Suggest PR template based on semantic similarity and optionally dynamic classification by Claude.
 
     Args:
         changes_summary: Description of what changes accomplish
-        change_type: Optional, existing label of change type (bug, feature, docs, etc.)
+        change_type: Optional, existing label of change type (bug, feature, docs, etc.).
+            A label listed in TYPE_MAPPING selects its template directly (confidence 0.8,
+            no alternatives); otherwise the summary is scored against template keywords
 
     Returns:
-        JSON string with recommended template, alternatives, confidence, reasoning
+        Dict with recommended template, alternatives, confidence, reasoning
     """
 
-    # Fetch available templates
-    templates_response = await get_pr_template()
-    templates = json.loads(templates_response)
+    # Fetch available templates and index them by filename for O(1) fallback lookups
+    templates = await _load_templates()
+    templates_by_filename = {t["filename"]: t for t in templates}
+
+    # A known change type already names the template: skip tokenizing and scoring entirely
+    if change_type and change_type.strip():
+        mapped_file = TYPE_MAPPING.get(change_type.lower().strip())
+        if mapped_file in templates_by_filename:
+            return _template_suggestion(
+                templates_by_filename[mapped_file],
+                [],
+                0.8,
+                f"Change type '{change_type}' maps to '{mapped_file}', so it was selected directly "
+                f"without semantic scoring."
+            )
 
-    # Tokenize the changes summary once
-    summary_tokens = tokenize(changes_summary)
+    # Tokenize the changes summary once; scoring only needs token presence
+    summary_token_set = frozenset(tokenize(changes_summary))
 
     # Step 1: Use Claude to dynamically classify change_type if not provided
     if not change_type or change_type.strip() == "":
@@ -316,15 +751,25 @@ async def suggest_templates(changes_summary: str, change_type: str = None) -> st
         change_type = "feature"
 
     normalized_type = change_type.lower().strip()
-    # Step 2: Score semantic similarity for each template via keywords
-    scores = []
-    for template in templates:
-        keywords = TEMPLATE_KEYWORDS.get(template["filename"], set())
-        score = compute_token_overlap_score(summary_tokens, keywords)
-        scores.append((template, score))
-
-    # Sort by score descending
-    scores.sort(key=lambda x: x[1], reverse=True)
+    # Step 2: Score semantic similarity via keywords. One pass over the summary tokens counts each
+    # template's keyword hits through the inverted index; templates without a hit score 0.
+    # Only the top 4 (selection + 3 alternatives) are kept
+    keyword_hits = Counter()
+    for token in summary_token_set:
+        keyword_hits.update(_KEYWORD_INDEX.get(token, ()))
+    if keyword_hits:
+        scores = heapq.nlargest(
+            4,
+            (
+                (template, keyword_hits[template["filename"]] / len(TEMPLATE_KEYWORDS[template["filename"]])
+                 if template["filename"] in keyword_hits else 0.0)
+                for template in templates
+            ),
+            key=itemgetter(1)
+        )
+    else:
+        # No keyword hit: every score is 0, so skip scoring and let the type fallback decide
+        scores = [(template, 0.0) for template in templates[:4]]
 
     # Step 3: Pick top scoring template, fallback to mapped template by type if no good score
     top_template, top_score = scores[0] if scores else (templates[0], 0.0)
@@ -332,29 +777,20 @@ async def suggest_templates(changes_summary: str, change_type: str = None) -> st
     # If semantic score low (<0.2), fallback to type-based mapping
     if top_score < 0.2:
         fallback_file = TYPE_MAPPING.get(normalized_type, "feature.md")
-        top_template = next((t for t in templates if t["filename"] == fallback_file), templates[0])
+        top_template = templates_by_filename.get(fallback_file, templates[0])
         top_score = 0.1  # Medium confidence
 
-    # Build alternatives excluding selected
-    alternatives = [t for t in templates if t["filename"] != top_template["filename"]][:3]
-
-    confidence_level = "high" if top_score > 0.6 else "medium" if top_score > 0.3 else "low"
-
-    suggestion = {
-        "recommended_template": top_template,
-        "alternatives": alternatives,
-        "confidence_level": confidence_level,
-        "confidence_score": top_score,
-        "reasoning": (
-            f"Based on semantic similarity between the changes summary and template keywords, "
-            f"'{top_template['filename']}' was selected with confidence score {top_score:.2f}. "
-            f"Original classification input was '{change_type}'."
-        ),
-        "template_content": top_template["content"],
-        "usage_hint": "Claude can assist filling this template or consider alternatives if needed."
-    }
+    # Alternatives are the next best ranked templates; the top 4 always hold 3 besides the selected one
+    alternatives = [t for t, _ in scores if t["filename"] != top_template["filename"]][:3]
 
-    return {"result": json.dumps(suggestion)}
+    return _template_suggestion(
+        top_template,
+        alternatives,
+        top_score,
+        f"Based on semantic similarity between the changes summary and template keywords, "
+        f"'{top_template['filename']}' was selected with confidence score {top_score:.2f}. "
+        f"Original classification input was '{change_type}'."
+    )
 
 
 @mcp.tool()
@@ -366,29 +802,15 @@ async def classify_commit_history(limit: int = 10):
         limit: Number of commits to inspect (default: 10)
     """
     try:
-        result = subprocess.run(
-            ["git", "log", f"-n {limit}", "--pretty=format:%s"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        commits = result.stdout.strip().split("\n")
+        output = await _run_git(None, "log", "-n", str(limit), "--pretty=format:%s")
+        commits = _decode(output).strip().split("\n")
         categorized = {"feature": [], "bugfix": [], "docs": [], "refactor": [], "other": []}
 
         for msg in commits:
-            lowered = msg.lower()
-            if any(word in lowered for word in ["add", "feature"]):
-                categorized["feature"].append(msg)
-            elif "fix" in lowered:
-                categorized["bugfix"].append(msg)
-            elif "doc" in lowered:
-                categorized["docs"].append(msg)
-            elif "refactor" in lowered:
-                categorized["refactor"].append(msg)
-            else:
-                categorized["other"].append(msg)
+            match = _COMMIT_CATEGORY_RE.match(msg)
+            categorized[_COMMIT_CATEGORIES[match.lastindex - 1] if match else "other"].append(msg)
 
-        return {"result": json.dumps(categorized)}
+        return {"result": categorized}
     except Exception as e:
         return {"error": str(e)}
 
@@ -399,15 +821,12 @@ async def get_changed_modules(base_branch: str = "master"):
     Return top-level modules/packages/files that changed since base_branch.
     """
     try:
-        result = subprocess.run(
-            ["git", "diff", "--name-only", f"{base_branch}...HEAD"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        paths = result.stdout.strip().split("\n")
-        modules = sorted(set(path.split("/")[0] for path in paths if path))
-        return {"result": json.dumps(modules)}
+        # -z: NUL-separated, unquoted paths, so splitting never trips over tabs/newlines in names
+        # --end-of-options: a base_branch starting with "-" is a revision, never a diff option
+        output = await _run_git(None, "diff", "--name-only", "-z", "--end-of-options", f"{base_branch}...HEAD")
+        top_levels = {path.split(b"/", 1)[0] for path in output.split(b"\0") if path}
+        modules = sorted(_decode(name) for name in top_levels)
+        return {"result": modules}
     except Exception as e:
         return {"error": str(e)}
 
@@ -416,17 +835,14 @@ async def get_changed_modules(base_branch: str = "master"):
 async def suggest_reviewers():
     """
     Suggest reviewers based on recent commit authors in the branch.
+
+    Returns the five most frequent authors, most active first.
     """
     try:
-        result = subprocess.run(
-            ["git", "log", "--pretty=format:%an <%ae>"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        authors = result.stdout.strip().split("\n")
-        unique_authors = sorted(set(authors))[:5]  # Top 5 unique
-        return {"result": json.dumps(unique_authors)}
+        output = await _run_git(None, "log", "--pretty=format:%an <%ae>")
+        authors = _decode(output).splitlines()
+        top_authors = [author for author, _ in Counter(authors).most_common(5)]  # Top 5 by commit count
+        return {"result": top_authors}
     except Exception as e:
         return {"error": str(e)}
 
@@ -437,17 +853,9 @@ async def detect_sensitive_tokens():
     Scan the git diff for any potential secrets or tokens.
     """
     try:
-        result = subprocess.run(
-            ["git", "diff", "--unified=0"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        suspicious_lines = [
-            line for line in result.stdout.split("\n")
-            if any(keyword in line.lower() for keyword in ["secret", "token", "apikey", "password", "auth"])
-        ]
-        return {"result": json.dumps(suspicious_lines)}
+        output = await _run_git(None, "diff", "--unified=0")
+        suspicious_lines = [_decode(line) for line in find_sensitive_lines(output)]
+        return {"result": suspicious_lines}
     except Exception as e:
         return {"error": str(e)}
 
@@ -458,14 +866,9 @@ async def summarize_commit_messages(limit: int = 10):
     Summarize last N commit messages.
     """
     try:
-        result = subprocess.run(
-            ["git", "log", f"-n {limit}", "--pretty=format:%h %s"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        summary = result.stdout.strip().split("\n")
-        return {"result": json.dumps(summary)}
+        output = await _run_git(None, "log", "-n", str(limit), "--pretty=format:%h %s")
+        summary = _decode(output).strip().split("\n")
+        return {"result": summary}
     except Exception as e:
         return {"error": str(e)}
 
@@ -2,8 +2,11 @@
 Unit Tests for GitHub MCP Server
 Run these tests to validate the implementation
 """
-import json
-from unittest.mock import patch, MagicMock
+import asyncio
+import os
+import random
+import re
+import subprocess
 
 import pytest
 
@@ -14,6 +17,7 @@ IMPORTS_SUCCESSFUL = None
 IMPORT_ERROR = None
 
 try:
+    import github_mcp_server
     from github_mcp_server import (
         mcp,
         analyze_file_changes,
@@ -28,6 +32,25 @@ except Exception as e:
     IMPORT_ERROR = str(e)
 
 
+def run_git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True
+    )
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """A repository with an empty commit on master and a feature branch adding a 1000-line file."""
+    run_git(tmp_path, "init", "-q", "--initial-branch=master")
+    run_git(tmp_path, "commit", "-q", "--allow-empty", "-m", "Initial commit")
+    run_git(tmp_path, "checkout", "-q", "-b", "feature")
+    (tmp_path / "file1.py").write_text("".join(f"line {i}\n" for i in range(1000)))
+    run_git(tmp_path, "add", "file1.py")
+    run_git(tmp_path, "commit", "-q", "-m", "Add file1")
+    return tmp_path
+
+
 class TestImplementation:
     """Test that the required functions are implemented."""
 
@@ -44,121 +67,434 @@ class TestImplementation:
 class TestAnalyzeFileChanges:
     """Test the analyze_file_changes tool."""
 
-    async def test_returns_json_string(self):
-        """Test that analyze_file_changes returns a JSON string."""
-        with patch('subprocess.run') as mock_run:
-            mock_run.return_value = MagicMock(stdout="", stderr="")
-
-            result = await analyze_file_changes()
+    async def test_returns_dict(self, git_repo):
+        """Test that analyze_file_changes returns a structured dict."""
+        result = await analyze_file_changes(working_directory=str(git_repo))
 
-            assert isinstance(result, str), "Should return a string"
-            data = json.loads(result)
-            assert isinstance(data, dict), "Should return a JSON object"
+        assert isinstance(result, dict), "Should return a dict"
+        assert "error" not in result, f"Unexpected error: {result.get('error')}"
 
-    async def test_includes_required_fields(self):
+    async def test_includes_required_fields(self, git_repo):
         """Test that the result includes expected fields."""
-        with patch('subprocess.run') as mock_run:
-            mock_run.return_value = MagicMock(stdout="M\tfile1.py\n", stderr="")
+        data = await analyze_file_changes(working_directory=str(git_repo))
+
+        assert data["files_changed"] == [{"status": "A", "file": "file1.py"}]
+        assert "Add file1" in data["commits"]
+        assert data["statistics"] == " file1.py | +1000 -0\n 1 file changed, 1000 insertions(+)\n"
+
+    async def test_renames_and_unusual_paths(self, git_repo):
+        """Test that renames keep both paths and file names are not quoted or split."""
+        run_git(git_repo, "checkout", "-q", "-b", "rename")
+        run_git(git_repo, "mv", "file1.py", "renamed.py")
+        (git_repo / "tab\tname.txt").write_text("hi\n")
+        run_git(git_repo, "add", "tab\tname.txt")
+        run_git(git_repo, "commit", "-q", "-m", "Rename file1")
+
+        data = await analyze_file_changes(base_branch="feature", working_directory=str(git_repo))
+
+        assert sorted(data["files_changed"], key=lambda f: f["file"]) == [
+            {"status": "R100", "file": "renamed.py", "old_file": "file1.py"},
+            {"status": "A", "file": "tab\tname.txt"},
+        ]
+        assert " file1.py => renamed.py | +0 -0\n" in data["statistics"]
+
+    async def test_cached_result_is_not_shared(self, git_repo):
+        """Test that mutating one response doesn't change what later calls return."""
+        first = await analyze_file_changes(working_directory=str(git_repo), include_diff=False)
+        first["files_changed"][0]["file"] = "mutated.py"
+        first["files_changed"].append({"status": "D", "file": "gone.py"})
 
-            result = await analyze_file_changes()
-            data = json.loads(result)
+        second = await analyze_file_changes(working_directory=str(git_repo), include_diff=False)
 
-            is_implemented = not ("error" in data and "Not implemented" in str(data.get("error", "")))
-            if is_implemented:
-                assert any(key in data for key in ["files_changed", "files", "changes", "diff"]), \
-                    "Result should include file change information"
-            else:
-                assert isinstance(data, dict), "Should return a JSON object even if not implemented"
+        assert second["files_changed"] == [{"status": "A", "file": "file1.py"}]
 
-    async def test_output_limiting(self):
+    async def test_output_limiting(self, git_repo):
         """Test that large diffs are properly truncated."""
-        with patch('subprocess.run') as mock_run:
-            large_diff = "\n".join([f"+ line {i}" for i in range(1000)])
+        data = await analyze_file_changes(working_directory=str(git_repo), include_diff=True)
+
+        diff_lines = data["diff"].split('\n')
+        assert len(diff_lines) < 600, "Large diffs should be truncated"
+        assert data["truncated"] is True, "Should indicate truncation"
+        assert data["total_diff_lines"] > 1000
+        assert "truncated" in data["diff"].lower(), "Should indicate diff was truncated"
+
+    async def test_non_utf8_diff(self, git_repo):
+        """Test that diff content that isn't valid UTF-8 is returned instead of failing to decode."""
+        (git_repo / "latin1.txt").write_bytes("caf\xe9\n".encode("latin-1"))
+        run_git(git_repo, "add", "latin1.txt")
+        run_git(git_repo, "commit", "-q", "-m", "Add latin-1 file")
+
+        data = await analyze_file_changes(working_directory=str(git_repo), max_diff_lines=5000)
+
+        assert "error" not in data, f"Unexpected error: {data.get('error')}"
+        assert "+caf\ufffd" in data["diff"]
+
+    async def test_without_diff(self, git_repo):
+        """Test that diff fields are omitted when the diff isn't requested."""
+        data = await analyze_file_changes(working_directory=str(git_repo), include_diff=False)
+
+        assert "files_changed" in data
+        assert "diff" not in data and "total_diff_lines" not in data
+
+    async def test_debug_block_is_opt_in(self, git_repo):
+        """Test that _debug is only attached when requested."""
+        data = await analyze_file_changes(working_directory=str(git_repo), include_diff=False)
+        assert "_debug" not in data
+
+        data = await analyze_file_changes(working_directory=str(git_repo), include_diff=False, debug=True)
+        assert data["_debug"]["git_repo_detected"] is True
+
+    async def test_unchanged_head(self, git_repo):
+        """Test that polling with the last shas short-circuits until HEAD moves."""
+        first = await analyze_file_changes(working_directory=str(git_repo))
+        poll = {"if_head_sha": first["head_sha"], "if_base_sha": first["base_sha"]}
+
+        unchanged = await analyze_file_changes(working_directory=str(git_repo), **poll)
+        assert unchanged == {"unchanged": True, "head_sha": first["head_sha"], "base_sha": first["base_sha"]}
+
+        run_git(git_repo, "commit", "-q", "--allow-empty", "-m", "Another commit")
+        changed = await analyze_file_changes(working_directory=str(git_repo), **poll)
+        assert "unchanged" not in changed
+        assert changed["head_sha"] != first["head_sha"]
 
-            mock_run.side_effect = [
-                MagicMock(stdout="M\tfile1.py\n", stderr=""),
-                MagicMock(stdout="1 file changed, 1000 insertions(+)", stderr=""),
-                MagicMock(stdout=large_diff, stderr=""),
-                MagicMock(stdout="abc123 Initial commit", stderr="")
-            ]
+    async def test_unchanged_requires_same_base(self, git_repo):
+        """Test that polling against a different or moved base branch returns a full result."""
+        first = await analyze_file_changes(working_directory=str(git_repo))
+        poll = {"if_head_sha": first["head_sha"], "if_base_sha": first["base_sha"]}
 
-            result = await analyze_file_changes(include_diff=True)
-            data = json.loads(result)
+        other_base = await analyze_file_changes(base_branch="feature", working_directory=str(git_repo), **poll)
+        assert "unchanged" not in other_base
+        assert other_base["files_changed"] == []
 
-            if "error" not in data or "Not implemented" not in str(data.get("error", "")):
-                if "diff" in data and data["diff"] != "Diff not included (set include_diff=true to see full diff)":
-                    diff_lines = data["diff"].split('\n')
-                    assert len(diff_lines) < 600, "Large diffs should be truncated"
+        run_git(git_repo, "branch", "-f", "master", "feature")
+        moved_base = await analyze_file_changes(working_directory=str(git_repo), **poll)
+        assert "unchanged" not in moved_base
+        assert moved_base["files_changed"] == []
 
-                    if "truncated" in data:
-                        assert data["truncated"] == True, "Should indicate truncation"
+        head_only = await analyze_file_changes(working_directory=str(git_repo), if_head_sha=first["head_sha"])
+        assert "unchanged" not in head_only
 
-                    assert "truncated" in data["diff"].lower() or "..." in data["diff"], \
-                        "Should indicate diff was truncated"
+    async def test_unknown_base_branch(self, git_repo):
+        """Test that an unknown base branch is reported as a git error, not as a missing repository."""
+        data = await analyze_file_changes(base_branch="does-not-exist", working_directory=str(git_repo))
+
+        assert data["error"].startswith("Git Error")
+
+    @pytest.mark.parametrize("base_branch", ["master..feature", "master^@", "HEAD:file1.py"])
+    async def test_base_branch_must_name_one_commit(self, git_repo, base_branch):
+        """Test that ranges and non-commit revisions are rejected as git errors."""
+        data = await analyze_file_changes(base_branch=base_branch, working_directory=str(git_repo))
+
+        assert data["error"].startswith("Git Error")
+
+    async def test_base_branch_is_never_an_option(self, git_repo, tmp_path):
+        """Test that an option-like base_branch is not passed on to git diff."""
+        target = tmp_path / "pwned"
+        data = await analyze_file_changes(base_branch=f"--output={target}", working_directory=str(git_repo))
+
+        assert data["error"].startswith("Git Error")
+        assert not list(tmp_path.glob("pwned*"))
+
+    async def test_not_a_git_repo(self, tmp_path):
+        """Test that a non-repository directory yields a structured error."""
+        data = await analyze_file_changes(working_directory=str(tmp_path))
+
+        assert "error" in data
+
+
+@pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
+class TestGitHelpers:
+    """Test the shared git subprocess helpers."""
+
+    def test_concurrency_limit_works_across_event_loops(self, git_repo):
+        """Test that git calls contending for slots work in every event loop, not just the first."""
+        async def burst():
+            calls = [github_mcp_server._run_git(str(git_repo), "rev-parse", "HEAD") for _ in range(20)]
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        for _ in range(2):
+            results = asyncio.run(burst())
+            assert not [r for r in results if isinstance(r, Exception)]
+
+
+    async def test_git_sees_the_current_environment(self, git_repo, monkeypatch):
+        """Test that environment changes made after import still reach git."""
+        monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+        monkeypatch.setenv("GIT_CONFIG_KEY_0", "review.marker")
+        monkeypatch.setenv("GIT_CONFIG_VALUE_0", "from-env")
+
+        output = await github_mcp_server._run_git(str(git_repo), "config", "review.marker")
+
+        assert output == b"from-env\n"
+
+
+def classify_by_lowered_substrings(msg):
+    """The original if/elif categorization that _COMMIT_CATEGORY_RE must reproduce."""
+    lowered = msg.lower()
+    if any(word in lowered for word in ["add", "feature"]):
+        return "feature"
+    elif "fix" in lowered:
+        return "bugfix"
+    elif "doc" in lowered:
+        return "docs"
+    elif "refactor" in lowered:
+        return "refactor"
+    return "other"
+
+
+def classify_by_regex(msg):
+    match = github_mcp_server._COMMIT_CATEGORY_RE.match(msg)
+    return github_mcp_server._COMMIT_CATEGORIES[match.lastindex - 1] if match else "other"
+
+
+def sensitive_lines_by_line_loop(diff):
+    """The original per-line scan that find_sensitive_lines must reproduce."""
+    keywords = ["secret", "token", "apikey", "password", "auth"]
+    text = diff.decode().replace("\r\n", "\n").replace("\r", "\n")
+    return [line for line in text.split("\n") if any(keyword in line.lower() for keyword in keywords)]
+
+
+@pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
+class TestTextHelpers:
+    """Test the module-level text matching helpers."""
+
+    def test_sensitive_line_with_several_hits_is_reported_once(self):
+        """Test that repeated and different keywords on one line still yield the line once."""
+        diff = b"+token = token_auth(secret)\n+name = 1\n+password\n"
+
+        assert github_mcp_server.find_sensitive_lines(diff) == [b"+token = token_auth(secret)", b"+password"]
+
+    def test_sensitive_last_line_without_newline(self):
+        """Test that a final line with no trailing newline is scanned and returned whole."""
+        diff = b"+x = 1\n+API_KEY = load()\n+ApiKey = 'abc'"
+
+        assert github_mcp_server.find_sensitive_lines(diff) == [b"+ApiKey = 'abc'"]
+
+    def test_sensitive_keywords_match_any_case(self):
+        """Test that keywords match case-insensitively while lines come back unchanged."""
+        diff = b"+SECRET=1\n+Auth: Bearer\n+safe\n+PassWord\r\n+ToKeN"
+
+        assert github_mcp_server.find_sensitive_lines(diff) == [b"+SECRET=1", b"+Auth: Bearer", b"+PassWord", b"+ToKeN"]
+
+    def test_sensitive_lines_match_line_loop(self):
+        """Test find_sensitive_lines against the original line loop on random diffs."""
+        rng = random.Random(0)
+        pieces = ["secret", "token", "apikey", "password", "auth", "TOKEN", "Auth", "tok", "\n", "\r\n", "\r", "+", " ", "x"]
+        for _ in range(5000):
+            diff = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 15))).encode()
+            expected = sensitive_lines_by_line_loop(diff)
+            assert [line.decode() for line in github_mcp_server.find_sensitive_lines(diff)] == expected, diff
+
+    @pytest.mark.parametrize("text, tokens", [
+        ("Fix_bug, add-Feature!  v2", ["fix_bug", "add", "feature", "v2"]),
+        ("Café déjà-vu №5", ["café", "déjà", "vu", "5"]),
+        ("", []),
+    ])
+    def test_tokenize(self, text, tokens):
+        """Test tokenize on the ASCII translate() path and the non-ASCII regex path."""
+        assert github_mcp_server.tokenize(text) == tokens
+
+    def test_tokenize_matches_original_regex(self):
+        """Test tokenize against the original re.findall on random ASCII and non-ASCII text."""
+        rng = random.Random(0)
+        alphabet = "aZ9_ -,.!\t\n'\u00e9\u0130\u00b2\u2116"
+        for _ in range(5000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            assert github_mcp_server.tokenize(text) == re.findall(r'\b\w+\b', text.lower()), text
+
+    @pytest.mark.parametrize("filename, template_type", [
+        ("test_bug.md", "Bug Fix"),
+        ("Feature.md", "Feature"),
+        ("performance_security.md", "Performance"),
+        ("security_docs.md", "Documentation"),
+        ("release_notes.md", "Release Notes"),
+    ])
+    def test_derive_type_uses_first_rule(self, filename, template_type):
+        """Test that the first rule in TEMPLATE_TYPE_RULES wins, not the leftmost substring."""
+        assert github_mcp_server._derive_type(filename) == template_type
+
+    @pytest.mark.parametrize("msg, category", [
+        ("fix: add retry", "feature"),
+        ("Hotfix for the parser", "bugfix"),
+        ("Update DOCS", "docs"),
+        ("Refactor loader", "refactor"),
+        ("f\u0130x the build", "other"),
+        ("bump version", "other"),
+    ])
+    def test_commit_category_priority(self, msg, category):
+        """Test that the first matching rule wins, whatever its position in the subject."""
+        assert classify_by_regex(msg) == category
+
+    def test_commit_category_matches_lowered_substrings(self):
+        """Test the regex against the original lower()/in chain on random subjects."""
+        rng = random.Random(0)
+        alphabet = "adfeixtorcuAFDXIR :\n\u0130\u212a\u017f\u00e9"
+        words = ["add", "feature", "fix", "doc", "refactor"]
+        for _ in range(5000):
+            parts = [rng.choice(words) if rng.random() < 0.2 else rng.choice(alphabet)
+                     for _ in range(rng.randint(0, 12))]
+            msg = "".join(c.upper() if rng.random() < 0.3 else c for c in "".join(parts))
+            assert classify_by_regex(msg) == classify_by_lowered_substrings(msg), msg
 
 
 @pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
 class TestGetPRTemplates:
     """Test the get_pr_templates tool."""
 
-    async def test_returns_json_string(self):
-        """Test that get_pr_templates returns a JSON string."""
+    async def test_returns_list(self):
+        """Test that get_pr_templates returns a list of templates under "result"."""
         result = await get_pr_template()
 
-        assert isinstance(result, str), "Should return a string"
-        data = json.loads(result)
-
-        is_implemented = not ("error" in data and isinstance(data, dict))
-        if is_implemented:
-            assert isinstance(data, list), "Should return a JSON array of templates"
-        else:
-            assert isinstance(data, dict), "Should return a JSON object even if not implemented"
+        assert isinstance(result, dict), "Should return a dict like the other tools"
+        assert isinstance(result["result"], list), "Should return a list of templates"
 
     async def test_returns_templates(self):
         """Test that templates are returned."""
-        result = await get_pr_template()
-        templates = json.loads(result)
+        templates = (await get_pr_template())["result"]
+
+        assert len(templates) > 0, "Should return at least one template"
+        for template in templates:
+            assert isinstance(template, dict), "Each template should be a dictionary"
+            assert any(key in template for key in ["filename", "name", "type", "id"]), \
+                "Templates should have an identifier"
+
+    async def test_sent_as_one_content_block(self):
+        """Test that the tool result reaches the client as a single JSON block."""
+        content = await mcp.call_tool("get_pr_template", {})
+
+        assert len(content) == 1
+
+
+def write_template(path, content, mtime=None):
+    """Write a template; an explicit (old) mtime makes it eligible for caching."""
+    path.write_text(content)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def templates_dir(tmp_path, monkeypatch):
+    """An empty TEMPLATES_DIR with the template caches reset around the test."""
+    directory = tmp_path / "templates"
+    directory.mkdir()
+    monkeypatch.setattr(github_mcp_server, "TEMPLATES_DIR", directory)
+    monkeypatch.setattr(github_mcp_server, "_templates_listing", None)
+    monkeypatch.setattr(github_mcp_server, "_templates_cache", None)
+    return directory
+
+
+OLD_MTIME = 1_000_000_000_000_000_000
+
+
+@pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
+class TestTemplateCache:
+    """Test that cached templates follow changes to the templates directory."""
+
+    async def test_in_place_edit_is_served(self, templates_dir):
+        write_template(templates_dir / "bug.md", "old", OLD_MTIME)
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["old"]
+
+        write_template(templates_dir / "bug.md", "new!", OLD_MTIME + 1)
+
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["new!"]
 
-        is_implemented = not ("error" in templates and isinstance(templates, dict))
-        if is_implemented:
-            assert len(templates) > 0, "Should return at least one template"
-            for template in templates:
-                assert isinstance(template, dict), "Each template should be a dictionary"
-                assert any(key in template for key in ["filename", "name", "type", "id"]), \
-                    "Templates should have an identifier"
-        else:
-            assert isinstance(templates, dict), "Should return structured error for starter code"
+    async def test_fresh_same_size_edit_is_served(self, templates_dir):
+        """Test that an edit within the mtime granularity isn't hidden by the cache."""
+        write_template(templates_dir / "bug.md", "aaa")
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["aaa"]
+
+        write_template(templates_dir / "bug.md", "bbb")
+
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["bbb"]
+
+    async def test_added_file_is_listed(self, templates_dir):
+        write_template(templates_dir / "bug.md", "bug", OLD_MTIME)
+        assert [t["filename"] for t in await github_mcp_server._load_templates()] == ["bug.md"]
+
+        write_template(templates_dir / "feature.md", "feature", OLD_MTIME)
+
+        assert [t["filename"] for t in await github_mcp_server._load_templates()] == ["bug.md", "feature.md"]
+
+    async def test_repointed_dir_is_not_served_from_cache(self, templates_dir, monkeypatch):
+        """Test that a second directory with the same names and mtimes is still read."""
+        other_dir = templates_dir.parent / "other"
+        other_dir.mkdir()
+        for directory, content in [(templates_dir, "first"), (other_dir, "second")]:
+            write_template(directory / "bug.md", content.ljust(6), OLD_MTIME)
+            os.utime(directory, ns=(OLD_MTIME, OLD_MTIME))
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["first "]
+
+        monkeypatch.setattr(github_mcp_server, "TEMPLATES_DIR", other_dir)
+
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["second"]
+
+    async def test_callers_cannot_alter_the_cache(self, templates_dir):
+        write_template(templates_dir / "bug.md", "bug", OLD_MTIME)
+        (await github_mcp_server._load_templates())[0]["content"] = "mutated"
+
+        assert [t["content"] for t in await github_mcp_server._load_templates()] == ["bug"]
 
 
 @pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
 class TestSuggestTemplate:
     """Test the suggest_template tool."""
 
-    async def test_returns_json_string(self):
-        """Test that suggest_template returns a JSON string."""
+    async def test_returns_dict(self):
+        """Test that suggest_template returns a structured dict."""
         result = await suggest_templates(
             "Fixed a bug in the authentication system",
             "bug"
         )
 
-        assert isinstance(result, str), "Should return a string"
-        data = json.loads(result)
-        assert isinstance(data, dict), "Should return a JSON object"
+        assert isinstance(result, dict), "Should return a dict"
 
     async def test_suggestion_structure(self):
         """Test that the suggestion has expected structure."""
-        result = await suggest_templates(
+        suggestion = await suggest_templates(
             "Added new feature for user management",
             "feature"
         )
-        suggestion = json.loads(result)
 
-        is_implemented = not ("error" in suggestion and "Not implemented" in str(suggestion.get("error", "")))
-        if is_implemented:
-            assert any(key in suggestion for key in ["template", "recommended_template", "suggestion"]), \
-                "Should include a template recommendation"
-        else:
-            assert isinstance(suggestion, dict), "Should return structured error for starter code"
+        assert any(key in suggestion for key in ["template", "recommended_template", "suggestion"]), \
+            "Should include a template recommendation"
+        assert suggestion["recommended_template"]["filename"] == "feature.md"
+
+    async def test_known_change_type_selects_mapped_template(self):
+        """Test that a change type listed in TYPE_MAPPING picks its template over keyword matches."""
+        suggestion = await suggest_templates("Update the readme and user guide", "fix")
+
+        assert suggestion["recommended_template"]["filename"] == "bug.md"
+        assert suggestion["confidence_score"] == 0.8
+        assert suggestion["alternatives"] == []
+
+    async def test_unknown_change_type_uses_keywords(self):
+        """Test that an unmapped change type falls back to keyword scoring."""
+        suggestion = await suggest_templates("Update the readme and user guide", "misc")
+
+        assert suggestion["recommended_template"]["filename"] == "docs.md"
+
+
+@pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
+class TestSuggestReviewers:
+    """Test the suggest_reviewers tool."""
+
+    async def test_most_frequent_authors_first(self, git_repo, monkeypatch):
+        """Test that the five most frequent authors are returned by commit count, not by name."""
+        for name, count in [("Dan", 1), ("Alice", 3), ("Bob", 4), ("Carol", 5), ("Frank", 6)]:
+            for i in range(count):
+                run_git(git_repo, "-c", f"user.name={name}", "-c", f"user.email={name.lower()}@example.com",
+                        "commit", "-q", "--allow-empty", "-m", f"{name} {i}")
+        monkeypatch.chdir(git_repo)
+
+        result = await github_mcp_server.suggest_reviewers()
+
+        assert result == {"result": [
+            "Frank <frank@example.com>",
+            "Carol <carol@example.com>",
+            "Bob <bob@example.com>",
+            "Alice <alice@example.com>",
+            "Test <test@example.com>",
+        ]}
 
 
 @pytest.mark.skipif(not IMPORTS_SUCCESSFUL, reason="Imports failed")
@@ -180,4 +516,7 @@ if __name__ == "__main__":
         print("3. Installed dependencies with: uv pip sync")
         exit(1)
 
-    pytest.main([__file__, "-v"])
+    # Direct runs only need the import check; skip pytest's plugin loading and collection.
+    # The full suite (git fixtures, async tests) runs with: pytest github_test_server.py
+    TestImplementation().test_imports()
+    print("✅ All tool functions import correctly")
@@ -3,26 +3,79 @@ Validation script for Module 1 starter code
 Ensures the starter template is ready for learners to implement
 """
 
+import functools
 import os
+import re
 import sys
+from importlib import import_module
 from pathlib import Path
+from types import SimpleNamespace
+
+# TOML parser picked once at import: stdlib on 3.11+, the tomli backport before that (if installed)
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+# Paths are resolved against the starter directory, so the checks don't depend on the current directory
+ROOT = Path(__file__).parent
+SERVER_FILE = ROOT / "github_mcp_server.py"
+PYPROJECT_FILE = ROOT / "pyproject.toml"
+REQUIRED_FILES = (SERVER_FILE, PYPROJECT_FILE, ROOT / "README.md")
+
+# Strings that suggest the tool functions are already implemented
+SOLUTION_INDICATORS = (
+    "subprocess.run",  # Git commands
+    "json.dumps",  # Returning JSON
+    "git diff",  # Git operations
+    "template",  # Template logic
+)
+
+# All indicators in one case-insensitive pass (ASCII folding, like the lowercase indicators themselves)
+_SOLUTION_RE = re.compile("|".join(map(re.escape, SOLUTION_INDICATORS)), re.IGNORECASE | re.ASCII)
+
+
+@functools.cache
+def cached_import(module_name, item_name=None):
+    """Import module_name once (reusing sys.modules) and return it, or its item_name attribute."""
+    module = sys.modules.get(module_name) or import_module(module_name)
+    return getattr(module, item_name) if item_name else module
+
+
+@functools.cache
+def _pyproject():
+    """pyproject.toml, read and parsed once per run."""
+    return tomllib.loads(PYPROJECT_FILE.read_text(encoding="utf-8"))
+
+
+@functools.cache
+def _probe_server():
+    """Import the server once and resolve the components the checks look for (None when missing)."""
+    module = cached_import("github_mcp_server")
+    return SimpleNamespace(
+        module=module,
+        mcp=getattr(module, "mcp", None),
+        analyze_file_changes=getattr(module, "analyze_file_changes", None)
+    )
 
 
 def test_project_structure():
     """Check that all required files exist."""
     print("Project Structure:")
-    required_files = [
-        "github_mcp_server.py",
-        "pyproject.toml",
-        "README.md"
-    ]
+    # One directory listing answers every check instead of a stat per required file
+    with os.scandir(ROOT) as entries:
+        present = frozenset(entry.name for entry in entries if entry.is_file())
 
     all_exist = True
-    for file in required_files:
-        if Path(file).exists():
-            print(f"  {file} exists")
+    for path in REQUIRED_FILES:
+        if path.name in present:
+            print(f"  {path.name} exists")
         else:
-            print(f"  {file} missing")
+            print(f"  {path.name} missing")
             all_exist = False
 
     return all_exist
@@ -32,11 +85,11 @@ def test_imports():
     """Test that the starter code imports work."""
     try:
         # Test importing the server module
-        import github_mcp_server
+        server = _probe_server()
         print("github_mcp_server.py imports successfully")
 
         # Check that FastMCP is imported
-        if hasattr(github_mcp_server, 'mcp'):
+        if server.mcp is not None:
             print("FastMCP server instance found")
         else:
             print("FastMCP server instance not found")
@@ -55,9 +108,9 @@ def test_starter_runs():
 
     try:
         # Try to import and check if server can be initialized
-        import github_mcp_server
+        server = _probe_server()
         # If we can import it and it has the right attributes, it should run
-        if hasattr(github_mcp_server, 'mcp') and hasattr(github_mcp_server, 'analyze_file_changes'):
+        if server.mcp is not None and server.analyze_file_changes is not None:
             print("Server imports and initializes correctly")
             return True
         else:
@@ -73,14 +126,12 @@ def test_dependencies():
     """Check that pyproject.toml is properly configured."""
     print("\nDependencies:")
 
-    try:
-        import tomllib
-    except ImportError:
-        import tomli as tomllib
+    if tomllib is None:
+        print("✗ Cannot read pyproject.toml: install tomli on Python < 3.11")
+        return False
 
     try:
-        with open("pyproject.toml", "rb") as f:
-            config = tomllib.load(f)
+        config = _pyproject()
 
         # Check for required sections
         if "project" in config and "dependencies" in config["project"]:
@@ -102,21 +153,11 @@ def test_no_implementation():
     """Ensure starter code doesn't contain the solution."""
     print("\nImplementation Check:")
 
-    with open("github_mcp_server.py", "r") as f:
-        content = f.read()
+    content = SERVER_FILE.read_text(encoding="utf-8")
 
-    # Check that tool functions are not implemented
-    solution_indicators = [
-        "subprocess.run",  # Git commands
-        "json.dumps",  # Returning JSON
-        "git diff",  # Git operations
-        "template",  # Template logic
-    ]
-
-    found_implementations = []
-    for indicator in solution_indicators:
-        if indicator in content.lower():
-            found_implementations.append(indicator)
+    # Check that tool functions are not implemented, reporting hits in SOLUTION_INDICATORS order
+    found = {match.group(0).lower() for match in _SOLUTION_RE.finditer(content)}
+    found_implementations = [indicator for indicator in SOLUTION_INDICATORS if indicator in found]
 
     if found_implementations:
         print(f"Found possible solution code: {', '.join(found_implementations)}")
@@ -132,10 +173,6 @@ def main():
     print("Github MCP Server Validation")
     print("=" * 50)
 
-    # Change to starter directory if needed
-    if Path("validate_starter.py").exists():
-        os.chdir(Path("validate_starter.py").parent)
-
     tests = [
         ("Project Structure", test_project_structure),
         ("Python Imports", test_imports),